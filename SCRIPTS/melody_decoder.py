@@ -1,125 +1,179 @@
+import array
 import itertools
 import string
-from music21 import scale, pitch
 import os
+import pickle
+from functools import lru_cache
 
-def load_word_list():
-    word_files = ['En.txt']
-    words = set()
+NOTE_TO_PC = {
+    'C': 0, 'C#': 1, 'D-': 1, 'D': 2, 'D#': 3, 'E-': 3, 'E': 4, 'E#': 5, 'F': 5, 'F#': 6, 'G-': 6,
+    'G': 7, 'G#': 8, 'A-': 8, 'A': 9, 'A#': 10, 'B-': 10, 'B': 11, 'B#': 0, 'C-': 11, 'F-': 4
+}
+UPPERCASE = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+MODE_INTERVALS = {
+    'Ionian': [0, 2, 4, 5, 7, 9, 11],
+    'Dorian': [0, 2, 3, 5, 7, 9, 10],
+    'Phrygian': [0, 1, 3, 5, 7, 8, 10],
+    'Lydian': [0, 2, 4, 6, 7, 9, 11],
+    'Mixolydian': [0, 2, 4, 5, 7, 9, 10],
+    'Aeolian': [0, 2, 3, 5, 7, 8, 10],
+    'Locrian': [0, 1, 3, 5, 6, 8, 10],
+    'Harmonic Minor': [0, 2, 3, 5, 7, 8, 11],
+}
+NLTK_DATA_PATH = os.path.join(os.path.expanduser('~'), 'nltk_data')
+# English words, then names
+LEXICON_FILES = ['En.txt', 'names.txt']
+# Bumped whenever the layout of the cached trie changes
+LEXICON_CACHE_VERSION = 3
+
+# Flattened trie row: a child per letter a-z, then the word-end flag
+TRIE_ROW = 27
+
+def load_lexicons():
+    # Read the word and name files with the same filter
     valid_single_letter_words = {'a', 'i'}
-    nltk_data_path = os.path.join(os.path.expanduser('~'), 'nltk_data')
-    for filename in word_files:
-        filepath = os.path.join(nltk_data_path, filename)
+    lexicons = []
+    for filename in LEXICON_FILES:
+        words = frozenset()
+        filepath = os.path.join(NLTK_DATA_PATH, filename)
         if os.path.isfile(filepath):
             with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    word = line.strip().lower()
-                    if word and (len(word) > 1 or word in valid_single_letter_words):
-                        words.add(word)
-    return words
+                lines = f.read().lower().splitlines()
+            words = frozenset(
+                w for w in (line.strip() for line in lines)
+                if w and (len(w) > 1 or w in valid_single_letter_words)
+            )
+        lexicons.append(words)
+    english_words, all_names = lexicons
+    return english_words, all_names
 
-def load_name_list():
-    name_files = ['names.txt']
-    names = set()
-    valid_single_letter_names = {'a', 'i'}
-    nltk_data_path = os.path.join(os.path.expanduser('~'), 'nltk_data')
-    for filename in name_files:
-        filepath = os.path.join(nltk_data_path, filename)
-        if os.path.isfile(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    name = line.strip().lower()
-                    if name and (len(name) > 1 or name in valid_single_letter_names):
-                        names.add(name)
-    return names
+def load_cached_lexicons():
+    # Reuse the pickled word lists and trie while the source files are unchanged
+    sources = [os.path.join(NLTK_DATA_PATH, filename) for filename in LEXICON_FILES]
+    mtimes = [os.path.getmtime(p) if os.path.isfile(p) else None for p in sources]
+    cache_file = os.path.join(os.path.expanduser('~'), '.cache', 'audiocipher', 'nltk_wordlists.pkl')
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+            if (cached.get('version') == LEXICON_CACHE_VERSION
+                    and cached['sources'] == sources and cached['mtimes'] == mtimes):
+                return cached['english_words'], cached['all_names'], cached['trie']
+        except Exception as e:
+            print(f"Ignoring unreadable word list cache {cache_file}: {e}")
 
-def is_valid_phrase(phrase, all_names, english_words):
-    if not phrase:
-        return False
-    valid_single_letter_words = {'a', 'i'}
-    for word in phrase:
-        if len(word) == 1 and word not in valid_single_letter_words:
-            return False
-        if not (word in english_words or word in all_names):
-            return False
-    return True
+    english_words, all_names = load_lexicons()
+    # Words that are also names are just inserted twice
+    trie = flatten_trie(build_trie(itertools.chain(english_words, all_names)))
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump({
+                'version': LEXICON_CACHE_VERSION,
+                'sources': sources,
+                'mtimes': mtimes,
+                'english_words': english_words,
+                'all_names': all_names,
+                'trie': trie
+            }, f, pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"Could not write word list cache {cache_file}: {e}")
+    return english_words, all_names, trie
+
+# Cached so enharmonic roots share one map
+@lru_cache(maxsize=None)
+def letters_by_pitch_class(root_pc, mode_name):
+    degree_pcs = [(root_pc + interval) % 12 for interval in MODE_INTERVALS[mode_name]]
+    letters_by_pc = [[] for _ in range(12)]
+    for i in range(26):
+        letters_by_pc[degree_pcs[i % len(degree_pcs)]].append(97 + i)
+    # Letters as ASCII bytes per pitch class
+    return tuple(bytes(letters) for letters in letters_by_pc)
 
-def create_letter_note_mapping(sc):
-    letters = string.ascii_lowercase
-    mapping = {}
-    idx = 0
-    degrees = list(range(1, 8)) if not isinstance(sc, scale.ChromaticScale) else list(range(1, 13))
-    degree_count = len(degrees)
-    while len(mapping) < 26:
-        degree = degrees[idx % degree_count]
-        p = sc.pitchFromDegree(degree)
-        pitch_name = p.name
-        mapping[letters[idx]] = pitch_name
-        idx += 1
-    return mapping
+def build_trie(words):
+    # Keyed by ASCII byte; only words of a-z can be decoded
+    trie = {}
+    for word in words:
+        if not (word.isascii() and word.isalpha()):
+            continue
+        node = trie
+        for c in word.encode('ascii'):
+            node = node.setdefault(c, {})
+        node['$'] = True
+    return trie
 
-def reverse_mapping(mapping):
-    note_to_letters = {}
-    for letter, pitch_name in mapping.items():
-        if pitch_name not in note_to_letters:
-            note_to_letters[pitch_name] = []
-        note_to_letters[pitch_name].append(letter)
-    return note_to_letters
+def flatten_trie(trie):
+    # Nodes are row offsets: trie[node + letter] is a child or -1, trie[node + 26] the word flag
+    nodes = [trie]
+    offsets = {id(trie): 0}
+    for node in nodes:
+        for c, child in node.items():
+            if c != '$':
+                offsets[id(child)] = len(nodes) * TRIE_ROW
+                nodes.append(child)
+    table = array.array('i', [-1]) * (len(nodes) * TRIE_ROW)
+    for node in nodes:
+        row = offsets[id(node)]
+        for c, child in node.items():
+            if c != '$':
+                table[row + c - 97] = offsets[id(child)]
+        table[row + 26] = 1 if '$' in node else 0
+    return table
 
-def segment_into_words(s, english_words, all_names, max_word_length):
-    n = len(s)
-    dp = [None] * (n + 1)
-    dp[0] = []
-    for i in range(1, n + 1):
-        for j in range(max(0, i - max_word_length), i):
-            word = s[j:i]
-            if word in english_words or word in all_names:
-                if dp[j] is not None:
-                    if dp[i] is None or len(dp[j]) + 1 < len(dp[i]):
-                        dp[i] = dp[j] + [word]
-    return dp[n]
+def decode_melody(letters_by_pc, melody_pc, trie, max_words):
+    # Segment while walking each note's letters depth-first
+    possible_letters = [letters_by_pc[pc] for pc in melody_pc]
+    if not possible_letters or not all(possible_letters):
+        return
+    n = len(possible_letters)
+    chars = bytearray(n)
+    counts = [None] * (n + 1)  # fewest words covering chars[:i]
+    parents = [0] * (n + 1)    # start of the last of those words
+    counts[0] = 0
+
+    def walk(k, active):
+        nonlocal max_words
+        if k == n:
+            if counts[n] is not None and counts[n] <= max_words:
+                s = chars.decode('ascii')
+                phrase = []
+                end = n
+                while end > 0:
+                    phrase.append(s[parents[end]:end])
+                    end = parents[end]
+                max_words = counts[n]
+                yield phrase[::-1]
+            return
+        for c in possible_letters[k]:
+            chars[k] = c
+            letter = c - 97
+            # Words still in progress as (start, trie node)
+            next_active = []
+            best = None
+            for start, node in active:
+                child = trie[node + letter]
+                if child < 0:
+                    continue
+                next_active.append((start, child))
+                if trie[child + 26] and (best is None or counts[start] + 1 < best):
+                    best = counts[start] + 1
+                    parents[k + 1] = start
+            counts[k + 1] = best
+            if best is not None and best < max_words:
+                next_active.append((k + 1, 0))
+            if next_active or k + 1 == n:
+                yield from walk(k + 1, next_active)
 
-def decode_melody(note_to_letters, melody):
-    possible_letters = []
-    for n in melody:
-        letters = note_to_letters.get(n, [])
-        if not letters:
-            try:
-                p = pitch.Pitch(n)
-                enharmonic_pitch = p.getEnharmonic()
-                enharmonic_name = enharmonic_pitch.name
-                letters = note_to_letters.get(enharmonic_name, [])
-            except:
-                letters = []
-        if letters:
-            possible_letters.append(letters)
-        else:
-            return []
-    combinations = list(itertools.product(*possible_letters))
-    decoded_strings = [''.join(combo) for combo in combinations]
-    return decoded_strings
+    yield from walk(0, [(0, 0)])
 
 def main():
-    english_words = load_word_list()
-    all_names = load_name_list()
+    english_words, all_names, trie = load_cached_lexicons()
     if not english_words and not all_names:
         print("No words or names loaded. Please check your word and name files.")
         return
-    max_word_length = max(len(word) for word in english_words.union(all_names))
     
     # Include all root notes
     root_notes = ['C', 'C#', 'D-', 'D', 'D#', 'E-', 'E', 'F', 'F#', 'G-', 'G', 'G#', 'A-', 'A', 'A#', 'B-', 'B']
-    # Include all modes
-    modes = {
-        'Ionian': scale.MajorScale,
-        'Dorian': scale.DorianScale,
-        'Phrygian': scale.PhrygianScale,
-        'Lydian': scale.LydianScale,
-        'Mixolydian': scale.MixolydianScale,
-        'Aeolian': scale.MinorScale,
-        'Locrian': scale.LocrianScale,
-        'Harmonic Minor': scale.HarmonicMinorScale,
-    }
     print("Enter a tone row to decipher.")
     print("Format: Enter note names separated by spaces (e.g., C# A F#)")
     print("Use standard note names (A, Bb, C#, etc.)")
@@ -127,37 +181,50 @@ def main():
     if not input_tone_row:
         print("No input provided.")
         return
-    melody_notes = input_tone_row.strip().split()
-    valid_note_names = [
-        'C', 'C#', 'D-', 'D', 'D#', 'E-', 'E', 'E#', 'F', 'F#', 'G-',
-        'G', 'G#', 'A-', 'A', 'A#', 'B-', 'B', 'B#', 'C-', 'F-'
-    ]
-    melody_notes = [n.upper() for n in melody_notes]
+    melody_notes = input_tone_row.translate(UPPERCASE).split()
+    melody_pc = []
     for n in melody_notes:
-        if n not in valid_note_names:
+        if n not in NOTE_TO_PC:
             print(f"Invalid note name: {n}")
             return
-    results = []
-    for decode_root in root_notes:
-        for decode_mode_name, decode_mode_class in modes.items():
-            decode_sc = decode_mode_class(decode_root)
-            note_letter_map = reverse_mapping(create_letter_note_mapping(decode_sc))
-            decoded_strings = decode_melody(note_letter_map, melody_notes)
-            for decoded_str in decoded_strings:
-                phrase = segment_into_words(decoded_str, english_words, all_names, max_word_length)
-                if phrase and is_valid_phrase(phrase, all_names, english_words):
-                    results.append({
-                        'phrase': ' '.join(phrase),
-                        'decoded_root_note': decode_root,
-                        'decoded_scale': decode_mode_name,
-                        'num_words': len(phrase)
-                    })
-    unique_results = { (r['phrase'], r['decoded_root_note'], r['decoded_scale']): r for r in results }.values()
-    if unique_results:
-        min_num_words = min(r['num_words'] for r in unique_results)
-        best_phrases = [r for r in unique_results if r['num_words'] == min_num_words]
+        melody_pc.append(NOTE_TO_PC[n])
+    scales = [
+        (decode_root, decode_mode_name, letters_by_pitch_class(NOTE_TO_PC[decode_root], decode_mode_name))
+        for decode_root in root_notes
+        for decode_mode_name in MODE_INTERVALS
+    ]
+    # Decode each distinct map able to cover the melody once
+    melody_pcs = set(melody_pc)
+    distinct_maps = [
+        note_letter_map
+        for note_letter_map in dict.fromkeys(note_letter_map for _, _, note_letter_map in scales)
+        if all(note_letter_map[pc] for pc in melody_pcs)
+    ]
+    # Abandon segmentations with more words than the best found so far
+    max_words = len(melody_pc)
+    phrases_by_map = {}
+    for note_letter_map in distinct_maps:
+        phrases = list(decode_melody(note_letter_map, melody_pc, trie, max_words))
+        if phrases:
+            max_words = min(max_words, min(map(len, phrases)))
+        phrases_by_map[note_letter_map] = phrases
+    # Report only the fewest-word phrases, once per scale
+    min_num_words = min((len(p) for phrases in phrases_by_map.values() for p in phrases), default=None)
+    best_phrases = {}
+    for decode_root, decode_mode_name, note_letter_map in scales:
+        for phrase in phrases_by_map.get(note_letter_map, []):
+            if len(phrase) != min_num_words:
+                continue
+            text = ' '.join(phrase)
+            best_phrases.setdefault((text, decode_root, decode_mode_name), {
+                'phrase': text,
+                'decoded_root_note': decode_root,
+                'decoded_scale': decode_mode_name,
+                'num_words': len(phrase)
+            })
+    if best_phrases:
         print("\nBest Phrases with the Fewest Number of Words:")
-        for r in best_phrases:
+        for r in best_phrases.values():
             print(f"Phrase: \"{r['phrase']}\", Decoded in: {r['decoded_scale']} scale starting at {r['decoded_root_note']}")
     else:
         print("No valid English phrases found for the given tone row.")
@@ -1,28 +1,88 @@
 # midi_to_tone_row.py
 
-from music21 import converter, note, stream
+import numpy as np
 import sys
 import os
 
-def midi_to_tone_row(midi_file_path):
-    # Load the MIDI file
+# Pitch-class names indexed by MIDI pitch number modulo 12, spelled as music21 does
+PITCH_CLASSES = np.array(['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B'], dtype=object)
+
+def single_note_mask(times, ends, tolerance):
+    # Flag the notes music21 reads as single notes rather than chord members:
+    # a chord gathers the notes that start and end within tolerance of its first
+    order = np.argsort(times, kind='stable')
+    times = times[order].tolist()
+    ends = ends[order].tolist()
+    in_chord = [False] * len(times)
+    for i in range(len(times)):
+        if in_chord[i]:
+            continue
+        for j in range(i + 1, len(times)):
+            if times[j] - times[i] >= tolerance:
+                break
+            if abs(ends[j] - ends[i]) <= tolerance:
+                in_chord[i] = in_chord[j] = True
+    single = np.empty(len(order), dtype=bool)
+    single[order] = np.logical_not(in_chord)
+    return single
+
+def music21_note_names(midi_file_path):
+    # Much slower than symusic; only used when symusic is not installed
+    from music21 import converter, note
+
     try:
         midi_stream = converter.parse(midi_file_path)
     except Exception as e:
         print(f"Error loading MIDI file: {e}")
-        return
-
-    # Flatten all parts into a single stream
-    flat_notes = midi_stream.flat.notes
+        return None
 
-    # Filter only notes (ignore chords and rests)
-    melody_notes = [n for n in flat_notes if isinstance(n, note.Note)]
+    # Filter only single notes (ignore chords and rests)
+    melody_notes = [n for n in midi_stream.flatten().notes if isinstance(n, note.Note)]
 
     # Sort notes by their offset to preserve the original sequence
     melody_notes.sort(key=lambda n: n.offset)
 
     # Extract note names (without octave numbers)
-    note_names = [n.pitch.name for n in melody_notes]
+    return [n.pitch.name for n in melody_notes]
+
+def symusic_note_names(midi_file_path):
+    # Imported here so the usage and file-not-found paths start instantly
+    import symusic
+
+    # Load the MIDI file
+    try:
+        score = symusic.Score(midi_file_path, ttype="tick")
+    except Exception as e:
+        print(f"Error loading MIDI file: {e}")
+        return None
+
+    # Export every track's notes as arrays and merge them into a single melody,
+    # leaving out chords within music21's quantization step (ignore chords and rests)
+    chord_tolerance = score.ticks_per_quarter / 4
+    pitches = [np.empty(0, dtype=np.int8)]
+    times = [np.empty(0, dtype=np.int32)]
+    for track in score.tracks:
+        arr = track.notes.numpy()
+        single = single_note_mask(arr['time'], arr['time'] + arr['duration'], chord_tolerance)
+        pitches.append(arr['pitch'][single])
+        times.append(arr['time'][single])
+    pitches = np.concatenate(pitches)
+    times = np.concatenate(times)
+
+    # Sort notes by their onset time to preserve the original sequence
+    order = np.argsort(times, kind='stable')
+
+    # Convert MIDI pitch numbers to note names (without octave numbers)
+    pitch_classes = (pitches[order] % 12).astype(np.int8)
+    return PITCH_CLASSES[pitch_classes]
+
+def midi_to_tone_row(midi_file_path):
+    try:
+        note_names = symusic_note_names(midi_file_path)
+    except ImportError:
+        note_names = music21_note_names(midi_file_path)
+    if note_names is None:
+        return
 
     # Create space-separated format
     tone_row = ' '.join(note_names)
@@ -1,14 +1,19 @@
 # udiocipher_decoder.py
 
-import itertools
 import string
 import sys
 import os
 import logging
-from music21 import converter, note, scale, pitch
-from multiprocessing import Pool, cpu_count
+import pickle
+import numpy as np
+import multiprocessing
+from multiprocessing import cpu_count, shared_memory
 from functools import partial
 
+# Keep Numba's compiled-kernel cache out of the source tree
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.numba_cache'))
+from numba import njit
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,32 +23,123 @@ logging.basicConfig(
     ]
 )
 
+# Pitch-class names indexed by MIDI pitch number modulo 12, spelled as music21 does
+PITCH_CLASSES = np.array(['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B'], dtype=object)
+
+# Pitch class of every accepted note spelling
+NOTE_TO_PC = {
+    'C': 0, 'C#': 1, 'D-': 1, 'D': 2, 'D#': 3, 'E-': 3, 'E': 4, 'E#': 5, 'F': 5, 'F#': 6, 'G-': 6,
+    'G': 7, 'G#': 8, 'A-': 8, 'A': 9, 'A#': 10, 'B-': 10, 'B': 11, 'B#': 0, 'C-': 11, 'F-': 4
+}
+
+LETTER_INDEX = {c: i for i, c in enumerate(string.ascii_lowercase)}
+UPPERCASE = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+# A seven-degree scale puts at most four of the 26 letters on one pitch class;
+# shorter rows of the letter tables are padded with NO_LETTER
+MAX_LETTERS_PER_PC = 4
+NO_LETTER = 0xFF
+
+# Read-only decoding data shared with the worker processes (see create_worker_pool)
+WORDS = frozenset()
+NAMES = frozenset()
+TRIE_CHILDREN = None
+TRIE_ISWORD = None
+TRIE_SHM = None
+
 def get_project_root():
     """
     Get the directory where the script is located.
     """
     return os.path.dirname(os.path.abspath(__file__))
 
-def midi_to_tone_row(midi_file_path):
+def music21_note_names(midi_file_path):
     """
-    Convert MIDI file to a space-separated string of note names.
+    Read the note names of a MIDI file with music21, which is much slower
+    than symusic and only used when symusic is not installed.
     """
+    from music21 import converter, note
+
     try:
         midi_stream = converter.parse(midi_file_path)
     except Exception as e:
         logging.error(f"Error loading MIDI file '{midi_file_path}': {e}")
         return None
 
-    flat_notes = midi_stream.flatten().notes
-
     # Filter only single notes (ignore chords and rests)
-    melody_notes = [n for n in flat_notes if isinstance(n, note.Note)]
+    melody_notes = [n for n in midi_stream.flatten().notes if isinstance(n, note.Note)]
 
     # Sort notes by their offset to preserve the original sequence
     melody_notes.sort(key=lambda n: n.offset)
 
     # Extract note names (without octave numbers)
-    note_names = [n.pitch.name for n in melody_notes]
+    return [n.pitch.name for n in melody_notes]
+
+def single_note_mask(times, ends, tolerance):
+    """
+    Flag the notes music21 reads as single notes rather than chord members: a
+    chord gathers the notes that start and end within tolerance of its first.
+    """
+    order = np.argsort(times, kind='stable')
+    times = times[order].tolist()
+    ends = ends[order].tolist()
+    in_chord = [False] * len(times)
+    for i in range(len(times)):
+        if in_chord[i]:
+            continue
+        for j in range(i + 1, len(times)):
+            if times[j] - times[i] >= tolerance:
+                break
+            if abs(ends[j] - ends[i]) <= tolerance:
+                in_chord[i] = in_chord[j] = True
+    single = np.empty(len(order), dtype=bool)
+    single[order] = np.logical_not(in_chord)
+    return single
+
+def symusic_note_names(midi_file_path):
+    """
+    Read the note names of a MIDI file with symusic.
+    """
+    # Imported here so that worker processes, which never parse MIDI, skip it
+    import symusic
+
+    try:
+        score = symusic.Score(midi_file_path, ttype="tick")
+    except Exception as e:
+        logging.error(f"Error loading MIDI file '{midi_file_path}': {e}")
+        return None
+
+    # Export every track's notes as arrays and merge them into a single melody,
+    # leaving out chords within music21's quantization step (ignore chords and rests)
+    chord_tolerance = score.ticks_per_quarter / 4
+    pitches = [np.empty(0, dtype=np.int8)]
+    times = [np.empty(0, dtype=np.int32)]
+    for track in score.tracks:
+        arr = track.notes.numpy()
+        single = single_note_mask(arr['time'], arr['time'] + arr['duration'], chord_tolerance)
+        pitches.append(arr['pitch'][single])
+        times.append(arr['time'][single])
+    pitches = np.concatenate(pitches)
+    times = np.concatenate(times)
+
+    # Sort notes by their onset time to preserve the original sequence
+    order = np.argsort(times, kind='stable')
+
+    # Convert MIDI pitch numbers to note names (without octave numbers)
+    pitch_classes = (pitches[order] % 12).astype(np.int8)
+    return PITCH_CLASSES[pitch_classes]
+
+def midi_to_tone_row(midi_file_path):
+    """
+    Convert MIDI file to a space-separated string of note names.
+    """
+    try:
+        note_names = symusic_note_names(midi_file_path)
+    except ImportError:
+        logging.warning("symusic is not installed; falling back to music21 for MIDI parsing.")
+        note_names = music21_note_names(midi_file_path)
+    if note_names is None:
+        return None
 
     # Create space-separated format
     tone_row = ' '.join(note_names)
@@ -51,26 +147,60 @@ def midi_to_tone_row(midi_file_path):
     logging.info(f"Extracted Tone Row from '{os.path.basename(midi_file_path)}': {tone_row}")
     return tone_row
 
-def load_word_list(word_file='wordlist.txt'):
+def get_cache_dir():
     """
-    Load English words from a specified file in the WORDLIST directory.
+    Get the directory where parsed word lists are cached between runs.
+    """
+    return os.path.join(os.path.expanduser('~'), '.cache', 'audiocipher')
+
+def read_word_file(filepath):
+    """
+    Read a one-word-per-line file into a frozenset of lowercase words.
+    The parsed set is pickled to the cache directory and reused for as long
+    as the source file is unchanged.
     """
-    words = set()
     valid_single_letter_words = {'a', 'i'}
+    source_mtime = os.path.getmtime(filepath)
+    cache_file = os.path.join(get_cache_dir(), os.path.splitext(os.path.basename(filepath))[0] + '.pkl')
+
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+            if cached['source'] == filepath and cached['mtime'] == source_mtime:
+                return cached['words']
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable word list cache '{cache_file}': {e}")
+
+    with open(filepath, 'rb') as f:
+        data = f.read().decode('utf-8', 'ignore').lower()
+    words = frozenset(
+        w for w in (line.strip() for line in data.splitlines())
+        if w and (len(w) > 1 or w in valid_single_letter_words)
+    )
+
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump({'source': filepath, 'mtime': source_mtime, 'words': words}, f, pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logging.warning(f"Could not write word list cache '{cache_file}': {e}")
+
+    return words
 
+def load_word_list(word_file='wordlist.txt'):
+    """
+    Load English words from a specified file in the WORDLIST directory.
+    """
     project_root = get_project_root()
     wordlist_dir = os.path.join(project_root, 'WORDLIST')
     filepath = os.path.join(wordlist_dir, word_file)
 
     if not os.path.isfile(filepath):
         logging.error(f"Word list file not found: {filepath}")
-        return words
+        return frozenset()
 
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            word = line.strip().lower()
-            if word and (len(word) > 1 or word in valid_single_letter_words):
-                words.add(word)
+    words = read_word_file(filepath)
 
     logging.info(f"Loaded {len(words)} English words from '{word_file}'.")
     return words
@@ -79,35 +209,59 @@ def load_name_list(name_file='names.txt'):
     """
     Load names from a specified file in the WORDLIST directory.
     """
-    names = set()
-    valid_single_letter_names = {'a', 'i'}
-
     project_root = get_project_root()
     wordlist_dir = os.path.join(project_root, 'WORDLIST')
     filepath = os.path.join(wordlist_dir, name_file)
 
     if not os.path.isfile(filepath):
-        return names
+        return frozenset()
 
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            name = line.strip().lower()
-            if name and (len(name) > 1 or name in valid_single_letter_names):
-                names.add(name)
+    names = read_word_file(filepath)
 
     logging.info(f"Loaded {len(names)} names from '{name_file}'.")
     return names
 
-def build_prefix_set(words):
+def build_trie(words):
     """
-    Build a set of all possible prefixes from the given word list.
+    Build a nested-dict trie of the given words; '$' marks the end of a word.
     """
-    prefixes = set()
+    trie = {}
+    num_nodes = 1
     for word in words:
-        for i in range(1, len(word)):
-            prefixes.add(word[:i])
-    logging.info(f"Built prefix set with {len(prefixes)} prefixes.")
-    return prefixes
+        node = trie
+        for c in word:
+            if c not in node:
+                node[c] = {}
+                num_nodes += 1
+            node = node[c]
+        node['$'] = True
+    logging.info(f"Built trie with {num_nodes} nodes.")
+    return trie
+
+def flatten_trie(trie):
+    """
+    Flatten a nested-dict trie into child and word-flag arrays for the compiled walk.
+    """
+    # Number nodes breadth-first from the root (node 0); characters outside
+    # a-z cannot come from a melody, so their branches are dropped
+    nodes = [trie]
+    ids = {id(trie): 0}
+    for node in nodes:
+        for c, child in node.items():
+            if c in LETTER_INDEX:
+                ids[id(child)] = len(nodes)
+                nodes.append(child)
+
+    # children[node * 26 + letter] is the child id or -1
+    children = np.full(len(nodes) * 26, -1, dtype=np.int32)
+    is_word = np.zeros(len(nodes), dtype=np.uint8)
+    for node_id, node in enumerate(nodes):
+        for c, child in node.items():
+            if c in LETTER_INDEX:
+                children[node_id * 26 + LETTER_INDEX[c]] = ids[id(child)]
+        if '$' in node:
+            is_word[node_id] = 1
+    return children, is_word
 
 def is_valid_phrase(phrase, all_names, english_words):
     """
@@ -123,174 +277,256 @@ def is_valid_phrase(phrase, all_names, english_words):
             return False
     return True
 
-def create_letter_note_mapping(sc):
+def letters_by_pitch_class(root, intervals):
+    """
+    Map the 26 letters onto the seven degrees of a scale, cycling through
+    the degrees, and group them by pitch class (0-11). The letters of each
+    pitch class are packed as a row of letter indices (0-25) in a (12, 4)
+    uint8 array, padded with NO_LETTER.
     """
-    Create a mapping from letters to note names based on the scale.
+    root_pc = NOTE_TO_PC[root]
+    letters_by_pc = np.full((12, MAX_LETTERS_PER_PC), NO_LETTER, dtype=np.uint8)
+    num_letters = np.zeros(12, dtype=np.int32)
+    for idx in range(26):
+        pc = (root_pc + intervals[idx % len(intervals)]) % 12
+        letters_by_pc[pc, num_letters[pc]] = idx
+        num_letters[pc] += 1
+    # Formatted lazily: the array repr is costly and this runs for all 96 scales at import
+    logging.debug("Letters by pitch class for %s: %s", root, letters_by_pc)
+    return letters_by_pc
+
+@njit(cache=True)
+def walk_melody(choices, num_choices, children, is_word):
     """
-    letters = string.ascii_lowercase
-    mapping = {}
-    degrees = list(range(1, 8))  # Diatonic degrees 1-7
-    degree_count = len(degrees)
-    idx = 0
+    Try each note's letter choices (choices[k, :num_choices[k]]) depth-first,
+    returning the letters and parent pointers of every fully segmentable sequence.
+    """
+    n = choices.shape[0]
+    chars = np.zeros(n, dtype=np.uint8)
+    counts = np.full(n + 1, -1, dtype=np.int32)   # fewest words covering chars[:i]
+    parents = np.zeros(n + 1, dtype=np.int32)     # start index of the last of those words
+    counts[0] = 0
+
+    # Frontier of in-progress words (start index, trie node) at each depth,
+    # plus the next choice to try there; an empty frontier prunes the branch
+    active_start = np.empty((n + 1, n + 1), dtype=np.int32)
+    active_node = np.empty((n + 1, n + 1), dtype=np.int32)
+    active_len = np.zeros(n + 1, dtype=np.int32)
+    next_choice = np.zeros(n + 1, dtype=np.int32)
+    active_start[0, 0] = 0
+    active_node[0, 0] = 0
+    active_len[0] = 1
+
+    found = 0
+    out_chars = np.empty((16, n), dtype=np.uint8)
+    out_parents = np.empty((16, n + 1), dtype=np.int32)
+
+    k = 0
+    while k >= 0:
+        if k == n:
+            if counts[n] >= 0:
+                if found == out_chars.shape[0]:
+                    grown_chars = np.empty((2 * found, n), dtype=np.uint8)
+                    grown_chars[:found] = out_chars
+                    out_chars = grown_chars
+                    grown_parents = np.empty((2 * found, n + 1), dtype=np.int32)
+                    grown_parents[:found] = out_parents
+                    out_parents = grown_parents
+                out_chars[found] = chars
+                out_parents[found] = parents
+                found += 1
+            k -= 1
+            continue
+        if next_choice[k] == num_choices[k]:
+            next_choice[k] = 0
+            k -= 1
+            continue
 
-    while len(mapping) < 26:
-        degree = degrees[idx % degree_count]
-        try:
-            p = sc.pitchFromDegree(degree)
-        except Exception as e:
-            logging.error(f"Invalid degree {degree} for scale {sc}: {e}")
-            return {}
-        pitch_name = p.name
-        mapping[letters[idx]] = pitch_name
-        idx += 1
-
-    logging.debug(f"Letter to Note Mapping: {mapping}")
-    return mapping
-
-def reverse_mapping(mapping):
-    """
-    Reverse the letter-to-note mapping to note-to-letters.
-    """
-    note_to_letters = {}
-    for letter, pitch_name in mapping.items():
-        if pitch_name not in note_to_letters:
-            note_to_letters[pitch_name] = []
-        note_to_letters[pitch_name].append(letter)
-    logging.debug(f"Note to Letters Mapping: {note_to_letters}")
-    return note_to_letters
-
-def decode_melody(note_to_letters, melody):
-    """
-    Decode the melody notes to possible letter sequences.
-    """
-    possible_letters = []
-    for n in melody:
-        letters = note_to_letters.get(n, [])
-        if not letters:
-            try:
-                p = pitch.Pitch(n)
-                enharmonic_pitch = p.getEnharmonic()
-                enharmonic_name = enharmonic_pitch.name
-                letters = note_to_letters.get(enharmonic_name, [])
-                logging.debug(f"Using enharmonic for {n}: {enharmonic_name} -> {letters}")
-            except Exception as e:
-                logging.error(f"Error finding enharmonic for note '{n}': {e}")
-                letters = []
-        if letters:
-            possible_letters.append(letters)
-        else:
-            return []
-    # Generate all possible combinations
-    return itertools.product(*possible_letters)
-
-def segment_into_words(decoded_chars, words_set, prefixes_set, max_word_length):
-    """
-    Segment the decoded characters into valid words.
-    """
-    n = len(decoded_chars)
-    dp = [None] * (n + 1)
-    dp[0] = []
-
-    for i in range(1, n + 1):
-        for j in range(max(0, i - max_word_length), i):
-            if dp[j] is not None:
-                word = ''.join(decoded_chars[j:i])
-                if word in words_set:
-                    if dp[i] is None or len(dp[j]) + 1 < len(dp[i]):
-                        dp[i] = dp[j] + [word]
-                elif word in prefixes_set:
-                    continue  # Possible prefix, continue searching
-    return dp[n]
-
-def process_root_mode(root_mode_tuple, melody_notes, words_set, prefixes_set, max_word_length, all_names, english_words):
-    """
-    Process a single root and mode to decode the melody.
-    """
-    decode_root, decode_mode_name, decode_mode_class = root_mode_tuple
+        c = choices[k, next_choice[k]]
+        next_choice[k] += 1
+        chars[k] = c
+        counts[k + 1] = -1
+        m = 0
+        for a in range(active_len[k]):
+            child = children[active_node[k, a] * 26 + c]
+            if child < 0:
+                continue
+            start = active_start[k, a]
+            active_start[k + 1, m] = start
+            active_node[k + 1, m] = child
+            m += 1
+            if is_word[child] and (counts[k + 1] < 0 or counts[start] + 1 < counts[k + 1]):
+                counts[k + 1] = counts[start] + 1
+                parents[k + 1] = start
+        if counts[k + 1] >= 0:
+            active_start[k + 1, m] = k + 1
+            active_node[k + 1, m] = 0
+            m += 1
+        active_len[k + 1] = m
+        if m > 0:
+            k += 1
+
+    return out_chars[:found], out_parents[:found]
+
+def segmentation_to_words(chars, parents):
+    """
+    Rebuild the list of words from a decoded letter sequence and its parent pointers.
+    """
+    text = (chars + 97).tobytes().decode('ascii')
+    words = []
+    end = len(text)
+    while end > 0:
+        start = parents[end]
+        words.append(text[start:end])
+        end = start
+    return words[::-1]
+
+def process_root_mode(task, melody_pc):
+    """
+    Decode the melody for one root and mode, trying only some of the first note's letters.
+    """
+    # The task is returned with its results so ties go to the earliest root/mode, whatever order tasks finish in
+    root_mode_idx, first_start, first_end = task
+    decode_root, decode_mode_name, _ = ROOT_MODES[root_mode_idx]
     try:
-        decode_sc = decode_mode_class(decode_root)
-        mapping = create_letter_note_mapping(decode_sc)
-        if not mapping:
-            return []
-        note_letter_map = reverse_mapping(mapping)
-        decoded_combinations = decode_melody(note_letter_map, melody_notes)
-        if not decoded_combinations:
-            return []
+        # Gather the candidate letter indices for each note in one indexing step
+        choices = ROOT_MODE_MAPS[root_mode_idx][melody_pc]
+        num_choices = np.count_nonzero(choices != NO_LETTER, axis=1).astype(np.int32)
+        if not len(choices) or not num_choices.all():
+            return task, []
+        first_letters = choices[0, first_start:first_end].copy()
+        choices[0, :len(first_letters)] = first_letters
+        num_choices[0] = len(first_letters)
 
         results = []
-        for decoded_chars in decoded_combinations:
-            phrase = segment_into_words(decoded_chars, words_set, prefixes_set, max_word_length)
-            if phrase and is_valid_phrase(phrase, all_names, english_words):
+        decoded_chars, decoded_parents = walk_melody(choices, num_choices, TRIE_CHILDREN, TRIE_ISWORD)
+        for chars, parents in zip(decoded_chars, decoded_parents):
+            phrase = segmentation_to_words(chars, parents)
+            if phrase and is_valid_phrase(phrase, NAMES, WORDS):
                 results.append({
                     'phrase': ' '.join(phrase),
                     'decoded_root_note': decode_root,
                     'decoded_scale': decode_mode_name,
                     'num_words': len(phrase)
                 })
-        return results
+        return task, results
     except Exception as e:
         logging.error(f"Error processing {decode_root} {decode_mode_name}: {e}")
-        return []
+        return task, []
+
+def init_worker(english_words, all_names, trie_shm_name, num_nodes):
+    """
+    Pool initializer for start methods that do not fork: store the word
+    lists in this worker's globals and map the trie arrays onto the shared
+    memory block created by the parent.
+    """
+    global WORDS, NAMES, TRIE_CHILDREN, TRIE_ISWORD, TRIE_SHM
+    WORDS = english_words
+    NAMES = all_names
+    TRIE_SHM = shared_memory.SharedMemory(name=trie_shm_name)
+    TRIE_CHILDREN = np.ndarray((num_nodes * 26,), dtype=np.int32, buffer=TRIE_SHM.buf)
+    TRIE_ISWORD = np.ndarray((num_nodes,), dtype=np.uint8, buffer=TRIE_SHM.buf, offset=num_nodes * 26 * 4)
+
+def create_worker_pool(trie_children, trie_is_word, all_names, english_words):
+    """
+    Create the worker pool, sharing the read-only decoding data rather than pickling it per task.
+    """
+    global WORDS, NAMES, TRIE_CHILDREN, TRIE_ISWORD
+    WORDS = english_words
+    NAMES = all_names
+    TRIE_CHILDREN = trie_children
+    TRIE_ISWORD = trie_is_word
+
+    # Fork only where it is the default; workers inherit the globals above
+    if multiprocessing.get_start_method() == 'fork':
+        return multiprocessing.get_context('fork').Pool(processes=cpu_count()), None
+
+    # Otherwise place the trie in shared memory, returned so the caller can release it
+    trie_shm = shared_memory.SharedMemory(create=True, size=trie_children.nbytes + trie_is_word.nbytes)
+    np.ndarray(trie_children.shape, dtype=np.int32, buffer=trie_shm.buf)[:] = trie_children
+    np.ndarray(trie_is_word.shape, dtype=np.uint8, buffer=trie_shm.buf, offset=trie_children.nbytes)[:] = trie_is_word
+    pool = multiprocessing.get_context('spawn').Pool(
+        processes=cpu_count(),
+        initializer=init_worker,
+        initargs=(english_words, all_names, trie_shm.name, len(trie_is_word))
+    )
+    return pool, trie_shm
 
-def decode_tone_row_parallel(tone_row, root_modes, words_set, prefixes_set, max_word_length, all_names, english_words):
+def decode_tone_row_parallel(tone_row, root_modes, trie_children, trie_is_word, all_names, english_words):
     """
     Decode the tone row using all root and mode combinations in parallel.
     """
-    melody_notes = tone_row.strip().split()
-    melody_notes = [n.upper() for n in melody_notes]
-    valid_note_names = set([
-        'C', 'C#', 'D', 'D#', 'E',
-        'F', 'F#', 'G', 'G#',
-        'A', 'A#', 'B'
-    ])
-
-    # Validate and handle enharmonic equivalents
-    for idx, n in enumerate(melody_notes):
-        if n not in valid_note_names:
-            try:
-                p = pitch.Pitch(n)
-                enharmonic_pitch = p.getEnharmonic()
-                enharmonic_name = enharmonic_pitch.name
-                if enharmonic_name in valid_note_names:
-                    melody_notes[idx] = enharmonic_name
-                    logging.debug(f"Replaced '{n}' with its enharmonic equivalent '{enharmonic_name}'.")
-                else:
-                    logging.error(f"Invalid note name after enharmonic conversion: '{enharmonic_name}'")
-                    return
-            except Exception as e:
-                logging.error(f"Invalid note name: '{n}'. Error: {e}")
-                return
-
-    logging.info(f"Starting decoding with {len(root_modes)} root-mode combinations.")
-    pool = Pool(processes=cpu_count())
+    melody_notes = tone_row.translate(UPPERCASE).split()
+
+    # Validate note names and encode the melody as pitch-class indices in one pass
+    melody_pc = []
+    for n in melody_notes:
+        if n not in NOTE_TO_PC:
+            logging.error(f"Invalid note name: '{n}'")
+            return
+        melody_pc.append(NOTE_TO_PC[n])
+    melody_pc = np.array(melody_pc, dtype=np.uint8)
+
+    tasks = []
+    if len(melody_pc):
+        melody_pcs = np.unique(melody_pc)
+        seen_signatures = set()
+        for root_mode_idx in root_modes:
+            melody_letters = ROOT_MODE_MAPS[root_mode_idx][melody_pcs]
+            # Skip scales missing a melody pitch class
+            if (melody_letters[:, 0] == NO_LETTER).any():
+                continue
+            # Search each distinct melody letter assignment once
+            signature = melody_letters.tobytes()
+            if signature in seen_signatures:
+                continue
+            seen_signatures.add(signature)
+            # Split the search by the first note's letter to spread it over workers
+            first_letters = ROOT_MODE_MAPS[root_mode_idx][melody_pc[0]]
+            num_first = np.count_nonzero(first_letters != NO_LETTER)
+            tasks.extend((root_mode_idx, i, i + 1) for i in range(num_first))
+
+        # Dispatch the largest searches first so no worker is left with a
+        # heavy task at the end. A task's size is estimated by the number of
+        # letter combinations after its first note, compared as a log sum.
+        def task_work(task):
+            num_letters = np.count_nonzero(ROOT_MODE_MAPS[task[0]] != NO_LETTER, axis=1)
+            return np.log(num_letters[melody_pc[1:]]).sum()
+        tasks.sort(key=task_work, reverse=True)
+
+    logging.info(f"Starting decoding with {len(root_modes)} root-mode combinations ({len(tasks)} tasks).")
+    pool, trie_shm = create_worker_pool(trie_children, trie_is_word, all_names, english_words)
     process_func = partial(
         process_root_mode,
-        melody_notes=melody_notes,
-        words_set=words_set,
-        prefixes_set=prefixes_set,
-        max_word_length=max_word_length,
-        all_names=all_names,
-        english_words=english_words
+        melody_pc=melody_pc
     )
+    # Deduplicate phrases as each task's results arrive, keeping the one with
+    # the fewest words. Ties go to the earliest root/mode so the reported
+    # scale does not depend on the order in which tasks finish.
+    unique_results = {}
+    result_ranks = {}
+    total_found = 0
     try:
-        all_results = pool.map(process_func, root_modes)
+        chunksize = max(1, len(tasks) // (cpu_count() * 4))
+        for task, results in pool.imap_unordered(process_func, tasks, chunksize=chunksize):
+            total_found += len(results)
+            for r in results:
+                key = r['phrase']  # Use phrase as the unique key
+                rank = (r['num_words'], task)
+                if key not in unique_results or rank < result_ranks[key]:
+                    unique_results[key] = r
+                    result_ranks[key] = rank
     except Exception as e:
         logging.error(f"Error during parallel processing: {e}")
-        all_results = []
+        unique_results = {}
     finally:
         pool.close()
         pool.join()
+        if trie_shm is not None:
+            trie_shm.close()
+            trie_shm.unlink()
 
-    # Flatten the list of results
-    flat_results = list(itertools.chain.from_iterable(all_results))
-    logging.info(f"Total valid decoded phrases found: {len(flat_results)}")
-
-    # Remove duplicates and keep the ones with the fewest words
-    unique_results = {}
-    for r in flat_results:
-        key = r['phrase']  # Use phrase as the unique key
-        if key not in unique_results or r['num_words'] < unique_results[key]['num_words']:
-            unique_results[key] = r
+    logging.info(f"Total valid decoded phrases found: {total_found}")
 
     if unique_results:
         # Sort the best phrases alphabetically
@@ -301,6 +537,36 @@ def decode_tone_row_parallel(tone_row, root_modes, words_set, prefixes_set, max_
     else:
         logging.info("No valid English phrases found for the given tone row.")
 
+# Root notes and modes (without enharmonic duplicates)
+ROOT_NOTES = [
+    'C', 'C#', 'D', 'D#', 'E',
+    'F', 'F#', 'G', 'G#',
+    'A', 'A#', 'B'
+]
+# Semitone offsets of the seven scale degrees from the root
+MODE_INTERVALS = {
+    'Major': [0, 2, 4, 5, 7, 9, 11],
+    'Dorian': [0, 2, 3, 5, 7, 9, 10],
+    'Phrygian': [0, 1, 3, 5, 7, 8, 10],
+    'Lydian': [0, 2, 4, 6, 7, 9, 11],
+    'Mixolydian': [0, 2, 4, 5, 7, 9, 10],
+    'Minor': [0, 2, 3, 5, 7, 8, 10],
+    'Locrian': [0, 1, 3, 5, 6, 8, 10],
+    'Harmonic Minor': [0, 2, 3, 5, 7, 8, 11],
+}
+
+# (root, mode name, intervals) tuples and their letters per pitch class,
+# built once per process so workers only index into them
+ROOT_MODES = [
+    (root, mode_name, intervals)
+    for root in ROOT_NOTES
+    for mode_name, intervals in MODE_INTERVALS.items()
+]
+ROOT_MODE_MAPS = [
+    letters_by_pitch_class(root, intervals)
+    for root, _, intervals in ROOT_MODES
+]
+
 def main():
     project_root = get_project_root()
     midi_dir = os.path.join(project_root, 'MIDI')
@@ -310,63 +576,38 @@ def main():
         return
 
     # List all MIDI files in the MIDI directory
-    midi_files = [f for f in os.listdir(midi_dir) if f.lower().endswith(('.mid', '.midi'))]
+    with os.scandir(midi_dir) as entries:
+        midi_files = [e for e in entries if e.is_file() and e.name.lower().endswith(('.mid', '.midi'))]
     
     if not midi_files:
         logging.error(f"No MIDI files found in the directory: {midi_dir}")
         return
 
+    # The word lists and trie do not depend on the MIDI file, so load and
+    # build them once for the whole run
+    english_words = load_word_list(word_file='wordlist.txt')
+    all_names = load_name_list(name_file='names.txt')
+    if not english_words and not all_names:
+        logging.error("No words or names loaded. Please check your word and name files in the WORDLIST directory.")
+        return
+
+    # Trie of the words that decoded phrases may be segmented into
+    trie_children, trie_is_word = flatten_trie(build_trie(english_words))
+
     # Process each MIDI file
     for midi_file in midi_files:
-        midi_file_path = os.path.join(midi_dir, midi_file)
-        logging.info(f"\nProcessing MIDI file: {midi_file}")
+        logging.info(f"\nProcessing MIDI file: {midi_file.name}")
 
-        tone_row = midi_to_tone_row(midi_file_path)
+        tone_row = midi_to_tone_row(midi_file.path)
         if tone_row is None:
             continue
 
-        english_words = load_word_list(word_file='wordlist.txt')
-        all_names = load_name_list(name_file='names.txt')
-        if not english_words and not all_names:
-            logging.error("No words or names loaded. Please check your word and name files in the WORDLIST directory.")
-            continue
-
-        # Build prefix set for early pruning
-        combined_words = english_words.union(all_names)
-        prefixes_set = build_prefix_set(combined_words)
-        
-        max_word_length = max((len(word) for word in combined_words), default=0)
-
-        # Initialize root notes and modes (without enharmonic duplicates)
-        root_notes = [
-            'C', 'C#', 'D', 'D#', 'E',
-            'F', 'F#', 'G', 'G#',
-            'A', 'A#', 'B'
-        ]
-        modes = {
-            'Major': scale.MajorScale,
-            'Dorian': scale.DorianScale,
-            'Phrygian': scale.PhrygianScale,
-            'Lydian': scale.LydianScale,
-            'Mixolydian': scale.MixolydianScale,
-            'Minor': scale.MinorScale,
-            'Locrian': scale.LocrianScale,
-            'Harmonic Minor': scale.HarmonicMinorScale,
-        }
-
-        # Prepare list of (root, mode name, mode class) tuples
-        root_modes = []
-        for root in root_notes:
-            for mode_name, mode_class in modes.items():
-                root_modes.append((root, mode_name, mode_class))
-
         # Call the parallel decoding function
         decode_tone_row_parallel(
             tone_row=tone_row,
-            root_modes=root_modes,
-            words_set=english_words,
-            prefixes_set=prefixes_set,
-            max_word_length=max_word_length,
+            root_modes=range(len(ROOT_MODES)),
+            trie_children=trie_children,
+            trie_is_word=trie_is_word,
             all_names=all_names,
             english_words=english_words
         )